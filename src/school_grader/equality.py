@@ -2,13 +2,25 @@ __author__ = "Marc-Olivier Derouin"
 __email__ = "marcolivier.derouin@poulet-frit.com"
 
 import re
-from typing import List, Tuple
+from typing import List, Tuple, Union
 import unittest
 from abc import ABC, abstractmethod
 
 
+_NUMBER_PATTERN = re.compile(r'[-+]?\d*\.\d+|\d+')
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Past this many cells per row, the banded Levenshtein DP is slower than the bit-parallel exact distance
+_MAX_BAND_WIDTH = 16
+# Polynomial rolling hash parameters used to compare substrings in linear time
+_HASH_BASE = 911382323
+_HASH_MODULUS = (1 << 61) - 1
+# Largest worst-case number of character comparisons for which plain substring searches beat rolling hashes
+_SCAN_BUDGET = 100_000
+
+
 class Equality(ABC):
     """Abstract base class for equality definitions"""
+    __slots__ = ('expected',)
 
     def __init__(self, expected: str):
         """Initialize the class with the expected value.
@@ -32,11 +44,12 @@ class Equality(ABC):
 
 class AlmostEqual(Equality):
     """Abstract base class for almost equal validation."""
-    pass
+    __slots__ = ()
 
 
 class AlmostEqualString(AlmostEqual):
     """Class for almost equal string validation."""
+    __slots__ = ('max_distance', '_expected_ascii')
 
     def __init__(self, expected: str, max_distance: int = 2):
         """Initialize the class with the expected value and the Levenshtein distance.
@@ -47,10 +60,12 @@ class AlmostEqualString(AlmostEqual):
         """
         super().__init__(expected)
         self.max_distance = max_distance
+        # Indexing bytes yields small integers, which are cheaper to compare than one-character strings
+        self._expected_ascii = expected.encode('ascii') if expected.isascii() else None
 
     @staticmethod
-    def _levenshtein(s1: str, s2: str) -> int:
-        """Calculate the Levenshtein distance between two strings.
+    def _levenshtein(s1: Union[str, bytes], s2: Union[str, bytes]) -> int:
+        """Calculate the Levenshtein distance between two strings, given both as `str` or both as `bytes`.
 
         Args:
             s1: The first string.
@@ -59,27 +74,89 @@ class AlmostEqualString(AlmostEqual):
         Returns:
             The Levenshtein distance between `s1` and `s2`.
         """
-        # Create a matrix with dimensions (length of s1 + 1) x (length of s2 + 1)
-        matrix = [[0] * (len(s2) + 1) for _ in range(len(s1) + 1)]
+        # Myers' bit-parallel algorithm: the shorter string is the pattern, one bit per character.
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        pattern_length = len(s2)
+        if pattern_length == 0:
+            return len(s1)
+
+        # Bitmask of the positions of each character in the pattern
+        peq = {}
+        for i, char in enumerate(s2):
+            peq[char] = peq.get(char, 0) | (1 << i)
+
+        mask = (1 << pattern_length) - 1
+        high_bit = 1 << (pattern_length - 1)
+        vertical_positive = mask
+        vertical_negative = 0
+        distance = pattern_length
+
+        for char in s1:
+            eq = peq.get(char, 0)
+            diagonal_zero = (((eq & vertical_positive) + vertical_positive) ^ vertical_positive) | eq | vertical_negative
+            horizontal_positive = vertical_negative | ~(diagonal_zero | vertical_positive)
+            horizontal_negative = vertical_positive & diagonal_zero
+
+            if horizontal_positive & high_bit:
+                distance += 1
+            elif horizontal_negative & high_bit:
+                distance -= 1
+
+            horizontal_positive = (horizontal_positive << 1) | 1
+            horizontal_negative <<= 1
+            vertical_negative = horizontal_positive & diagonal_zero
+            vertical_positive = (horizontal_negative | ~(horizontal_positive | diagonal_zero)) & mask
+
+        return distance
+
+    @staticmethod
+    def _bounded_levenshtein(s1: Union[str, bytes], s2: Union[str, bytes], max_distance: int) -> int:
+        """Calculate the Levenshtein distance between two strings, given both as `str` or both as `bytes`, stopping as soon as it exceeds `max_distance`.
 
-        # Initialize the first row and column of the matrix
-        for i in range(len(s1) + 1):
-            matrix[i][0] = i
-        for j in range(len(s2) + 1):
-            matrix[0][j] = j
+        Args:
+            s1: The first string.
+            s2: The second string.
+            max_distance: The largest distance of interest.
+
+        Returns:
+            The Levenshtein distance between `s1` and `s2` if it is at most `max_distance`, `max_distance + 1` otherwise.
+        """
+        too_far = max_distance + 1
+        if abs(len(s1) - len(s2)) > max_distance:
+            return too_far
+        if 2 * max_distance + 1 > _MAX_BAND_WIDTH:
+            return min(AlmostEqualString._levenshtein(s1, s2), too_far)
+
+        # Only the cells at most `max_distance` away from the diagonal can hold a distance within the bound
+        s2_length = len(s2)
+        previous = [j if j <= max_distance else too_far for j in range(s2_length + 1)]
+        current = [too_far] * (s2_length + 1)
 
-        # Fill in the rest of the matrix
         for i in range(1, len(s1) + 1):
-            for j in range(1, len(s2) + 1):
-                cost = 0 if s1[i - 1] == s2[j - 1] else 1
-                matrix[i][j] = min(
-                    matrix[i - 1][j] + 1,           # deletion
-                    matrix[i][j - 1] + 1,           # insertion
-                    matrix[i - 1][j - 1] + cost     # substitution
+            start = max(1, i - max_distance)
+            end = min(s2_length, i + max_distance)
+            current[start - 1] = i if start == 1 else too_far
+            row_minimum = current[start - 1]
+
+            char = s1[i - 1]
+            for j in range(start, end + 1):
+                cost = 0 if char == s2[j - 1] else 1
+                value = min(
+                    previous[j] + 1,            # deletion
+                    current[j - 1] + 1,         # insertion
+                    previous[j - 1] + cost      # substitution
                 )
+                current[j] = value
+                if value < row_minimum:
+                    row_minimum = value
+
+            # The distance can only grow from one row to the next
+            if row_minimum > max_distance:
+                return too_far
+            previous, current = current, previous
 
-        # The final value in the bottom-right corner of the matrix is the Levenshtein distance
-        return matrix[-1][-1]
+        return min(previous[s2_length], too_far)
 
     def validate(self, test_case: unittest.TestCase, value_to_test: str, fail_message: str) -> None:
         """Validate almost equal string equality between `value_to_test` and the expected value.
@@ -89,11 +166,26 @@ class AlmostEqualString(AlmostEqual):
             value_to_test: The value to test for equality.
             fail_message: The message to display if the equality check fails.
         """
-        test_case.assertLessEqual(AlmostEqualString._levenshtein(value_to_test, self.expected), self.max_distance, fail_message)
+        expected = self.expected
+        if value_to_test == expected:
+            return
+
+        # The distance is at least the difference in length, and exactly that when one of the strings is empty
+        length_difference = abs(len(value_to_test) - len(expected))
+        if length_difference > self.max_distance:
+            distance = self.max_distance + 1
+        elif not value_to_test or not expected:
+            distance = length_difference
+        else:
+            if self._expected_ascii is not None and value_to_test.isascii():
+                expected, value_to_test = self._expected_ascii, value_to_test.encode('ascii')
+            distance = AlmostEqualString._bounded_levenshtein(value_to_test, expected, self.max_distance)
+        test_case.assertLessEqual(distance, self.max_distance, fail_message)
 
 
 class AlmostEqualNumber(AlmostEqual):
     """Class for almost equal numerical validation."""
+    __slots__ = ('precision', '_expected_numbers')
 
     def __init__(self, expected: str, precision: int = 7):
         """Initialize the class with the expected value and the precision values.
@@ -104,6 +196,7 @@ class AlmostEqualNumber(AlmostEqual):
         """
         super().__init__(expected)
         self.precision = precision
+        self._expected_numbers = [float(number) for number in _NUMBER_PATTERN.findall(expected)]
 
     def validate(self, test_case: unittest.TestCase, value_to_test: str, fail_message: str) -> None:
         """Validate almost equal numerical equality between `value_to_test` and the expected value.
@@ -113,18 +206,20 @@ class AlmostEqualNumber(AlmostEqual):
             value_to_test: The value to test for equality.
             fail_message: The message to display if the equality check fails.
         """
-        expected_numbers = list(map(float, re.findall(r'[-+]?\d*\.\d+|\d+', self.expected)))
-        result_numbers = list(map(float, re.findall(r'[-+]?\d*\.\d+|\d+', value_to_test)))
+        expected_numbers = self._expected_numbers
+        result_numbers = _NUMBER_PATTERN.findall(value_to_test)
 
         if len(expected_numbers) != len(result_numbers):
             raise AssertionError(f"Expected {len(expected_numbers)} numbers, but got {len(result_numbers)}")
 
         for expected_number, result_number in zip(expected_numbers, result_numbers):
-            test_case.assertAlmostEqual(float(expected_number), float(result_number), self.precision, fail_message)
+            test_case.assertAlmostEqual(expected_number, float(result_number), self.precision, fail_message)
 
 
 class Equal(Equality):
     """Abstract base class for equality validation."""
+    __slots__ = ()
+
     @staticmethod
     @abstractmethod
     def preprocess_for_comparison(expected: str, value_to_test: str) -> Tuple[str, str]:
@@ -153,13 +248,22 @@ def CombineEqualities(*equalities: List[Equal]) -> Equal:
     """Combine multiple equalities into a single equality.
 
     Args:
-        *equalities: The equalities to combine.
+        *equalities: The equalities to combine, as `Equal` subclasses or instances.
 
     Returns:
         A single equality that combines all of the provided equalities.
+
+    Raises:
+        TypeError: If one of the equalities is not an `Equal` subclass or instance.
     """
+    for equality in equalities:
+        if not isinstance(equality, Equal) and not (isinstance(equality, type) and issubclass(equality, Equal)):
+            raise TypeError(f"Expected an Equal subclass or instance, but got {equality!r}")
+    preprocessors = tuple(equality.preprocess_for_comparison for equality in equalities)
+
     class CombinedEquality(Equal):
         """Class for combined equality validation."""
+        __slots__ = ()
 
         def __init__(self, expected: str):
             """Initialize the class with the expected string value.
@@ -179,16 +283,15 @@ def CombineEqualities(*equalities: List[Equal]) -> Equal:
             Returns:
                 A tuple containing the expected and value_to_test values after alteration.
             """
-            for equality in equalities:
-                if not isinstance(equality, Equal):
-                    raise TypeError(f"Expected an instance of Equal, but got {type(equality)}")
-                expected, value_to_test = equality.preprocess_for_comparison(expected, value_to_test)
+            for preprocess in preprocessors:
+                expected, value_to_test = preprocess(expected, value_to_test)
             return expected, value_to_test
     return CombinedEquality
 
 
 class CaseInsensitiveStringEquality(Equal):
     """Class for case-insensitive string equality validation."""
+    __slots__ = ('_expected_lower',)
 
     def __init__(self, expected: str):
         """Initialize the class with the expected string value.
@@ -197,6 +300,7 @@ class CaseInsensitiveStringEquality(Equal):
             expected: The expected string value.
         """
         super().__init__(expected)
+        self._expected_lower = expected.lower()
 
     @staticmethod
     def preprocess_for_comparison(expected: str, value_to_test: str) -> Tuple[str, str]:
@@ -211,9 +315,20 @@ class CaseInsensitiveStringEquality(Equal):
         """
         return expected.lower(), value_to_test.lower()
 
+    def validate(self, test_case: unittest.TestCase, value_to_test: str, fail_message: str) -> None:
+        """Validate case-insensitive equality between `value_to_test` and the lowercased expected value computed at initialization.
+
+        Args:
+            test_case: Instance of `unittest.TestCase` to run the equality check.
+            value_to_test: The value to test for equality.
+            fail_message: The message to display if the equality check fails.
+        """
+        test_case.assertEqual(self._expected_lower, value_to_test.lower(), fail_message)
+
 
 class WhiteSpaceInsensitiveEquality(Equal):
     """Class for space-insensitive equality validation."""
+    __slots__ = ()
 
     def __init__(self, expected: str):
         """Initialize the class with the expected string value.
@@ -234,11 +349,12 @@ class WhiteSpaceInsensitiveEquality(Equal):
         Returns:
             A tuple containing the expected and value_to_test values after alteration by removing all whitespace.
         """
-        return re.sub(r"\s+", "", expected), re.sub(r"\s+", "", value_to_test)
+        return _WHITESPACE_PATTERN.sub("", expected), _WHITESPACE_PATTERN.sub("", value_to_test)
 
 
 class ContainsEquality(Equal):
     """Class for contains equality validation. Checks if the expected value is contained in the value to test."""
+    __slots__ = ()
 
     def __init__(self, expected: str):
         """Initialize the class with the expected string value.
@@ -250,28 +366,60 @@ class ContainsEquality(Equal):
 
     @staticmethod
     def _find_largest_substring(word: str, target: str) -> str:
-        word_length = len(word)
-        target_length = len(target)
-
-        # Create a table to store the lengths of common substrings
-        table: List[List[int]] = [[0] * (target_length + 1) for _ in range(word_length + 1)]
-
-        # Variables to track the longest common substring and its length
-        max_length = 0
-        end_index = 0
-
-        # Fill the table using dynamic programming
-        for i in range(1, word_length + 1):
-            for j in range(1, target_length + 1):
-                if word[i - 1] == target[j - 1]:
-                    table[i][j] = table[i - 1][j - 1] + 1
-                    if table[i][j] > max_length:
-                        max_length = table[i][j]
-                        end_index = i
-
-        # Extract the longest common substring
-        largest_substring = word[end_index - max_length:end_index]
-        return largest_substring
+        """Find the longest substring of `word` that is also contained in `target`.
+
+        Args:
+            word: The string to extract the substring from.
+            target: The string the substring must be contained in.
+
+        Returns:
+            The first longest common substring found in `word`, or an empty string if there is none.
+        """
+        def window_hashes(string: str, length: int):
+            """Yield the rolling hash of every window of `length` consecutive characters, from left to right."""
+            codes = [ord(char) for char in string]
+            high_power = pow(_HASH_BASE, length - 1, _HASH_MODULUS)
+            value = 0
+            for code in codes[:length]:
+                value = (value * _HASH_BASE + code) % _HASH_MODULUS
+            yield value
+            for i in range(len(codes) - length):
+                value = ((value - codes[i] * high_power) * _HASH_BASE + codes[i + length]) % _HASH_MODULUS
+                yield value
+
+        def find_common(length: int) -> int:
+            """Return the index of the first substring of `word` of the given length contained in `target`, or -1.
+
+            Short inputs are probed with one C-level substring search per window. Past `_SCAN_BUDGET`, windows are
+            compared by hash instead, so a probe stays linear in the length of both strings; a matching hash is
+            confirmed with a substring search, which only repeats on (unlikely) hash collisions.
+            """
+            window_count = len(word) - length + 1
+            if window_count * len(target) <= _SCAN_BUDGET:
+                for i in range(window_count):
+                    if word[i:i + length] in target:
+                        return i
+                return -1
+
+            target_hashes = set(window_hashes(target, length))
+            for i, value in enumerate(window_hashes(word, length)):
+                if value in target_hashes and word[i:i + length] in target:
+                    return i
+            return -1
+
+        # Every prefix of a common substring is also common, so the largest length can be binary searched
+        low, high = 0, min(len(word), len(target))
+        start = 0
+        while low < high:
+            length = (low + high + 1) // 2
+            index = find_common(length)
+            if index == -1:
+                high = length - 1
+            else:
+                low = length
+                start = index
+
+        return word[start:start + low]
 
     @staticmethod
     def preprocess_for_comparison(expected: str, value_to_test: str) -> Tuple[str, str]:
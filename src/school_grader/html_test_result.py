@@ -3,158 +3,146 @@ __email__ = "marcolivier.derouin@poulet-frit.com"
 
 from abc import ABC, abstractmethod
 from typing import List
+import re
 import unittest
 import webbrowser
 
 
-HTML_BEGIN = (
-    "<html>"
-    "<head>"
-    '<link href="https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap" rel="stylesheet">'
-    "<style>"
-    "table {"
-    "border-radius: 10px;"
-    "width: 100%;"
-    "margin: 40px auto;"
-    "box-shadow: 0 2px 15px rgba(0, 0, 0, 0.1);"
-    "text-align: center;"
-    "border-spacing: 0;"
-    "}"
-    "table tr:first-child td {"
-    "border-top: 0;"
-    "}"
-    "table tr td:first-child {"
-    "border-left: 0;"
-    "}"
-    "table tr:last-child td {"
-    "border-bottom: 0;"
-    "}"
-    "table tr td:last-child {"
-    "border-right: 0;"
-    "}"
-    "th, td {"
-    "border: solid 1px #68706a29;"
-    "padding: 20px;"
-    "font-size: 16px;"
-    "font-weight: 500;"
-    "color: #333;"
-    "text-align: center;"
-    "vertical-align: middle;"
-    "}"
-    "th {"
-    "background-color: #ddd;"
-    "font-weight: bold;"
-    "}"
-    "pre {"
-    "background-color: #f6f8fa;"
-    "border-radius: 10px;"
-    "font-size: 85%;"
-    "line-height: 1.45;"
-    "overflow: auto;"
-    "padding: 16px;"
-    "text-align: left;"
-    "margin: 20px 0;"
-    "}"
-    "body {"
-    "padding: 20px;"
-    "background-color: #f2f2f2;"
-    "font-family: 'Roboto', sans-serif;"
-    "}"
-    ".error {"
-    "background-color: #FFE844;"
-    "}"
-    ".pass {"
-    "background-color: #A6FB88;"
-    "}"
-    ".fail {"
-    "background-color: #FF4444;"
-    "}"
-    "</style>"
-    "</head>"
-    "<body>"
-    "<table>"
-    "<tr>"
-    "<th>Test name</th>"
-    "<th>Directory</th>"
-    "<th>Result</th>"
-    "<th>Stack trace</th>"
-    "</tr>"
-)
-
-HTML_END = (
-    "</table>"
-    "</body>"
-    "</html>"
-)
+# Line breaks and the indentation following them only make the templates readable, they are stripped from the report
+HTML_BEGIN = re.sub(r"\s*\n\s*", "", """
+<html>
+<head>
+<link href="https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap" rel="stylesheet">
+<style>
+table {
+    border-radius: 10px;
+    width: 100%;
+    margin: 40px auto;
+    box-shadow: 0 2px 15px rgba(0, 0, 0, 0.1);
+    text-align: center;
+    border-spacing: 0;
+}
+table tr:first-child td {
+    border-top: 0;
+}
+table tr td:first-child {
+    border-left: 0;
+}
+table tr:last-child td {
+    border-bottom: 0;
+}
+table tr td:last-child {
+    border-right: 0;
+}
+th, td {
+    border: solid 1px #68706a29;
+    padding: 20px;
+    font-size: 16px;
+    font-weight: 500;
+    color: #333;
+    text-align: center;
+    vertical-align: middle;
+}
+th {
+    background-color: #ddd;
+    font-weight: bold;
+}
+pre {
+    background-color: #f6f8fa;
+    border-radius: 10px;
+    font-size: 85%;
+    line-height: 1.45;
+    overflow: auto;
+    padding: 16px;
+    text-align: left;
+    margin: 20px 0;
+}
+body {
+    padding: 20px;
+    background-color: #f2f2f2;
+    font-family: 'Roboto', sans-serif;
+}
+.error {
+    background-color: #FFE844;
+}
+.pass {
+    background-color: #A6FB88;
+}
+.fail {
+    background-color: #FF4444;
+}
+</style>
+</head>
+<body>
+<table>
+<tr>
+    <th>Test name</th>
+    <th>Directory</th>
+    <th>Result</th>
+    <th>Stack trace</th>
+</tr>
+""")
+
+HTML_END = "</table></body></html>"
+
+
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 
 def sanitize_html(html_string: str) -> str:
-    return html_string.replace("<", "&lt;").replace(">", "&gt;")
+    return html_string.translate(_HTML_ESCAPE)
 
 
 class HTMLResult(ABC):
     """An abstract class for the HTML result of a test."""
+    __slots__ = ('_test', '_name', '_dir')
 
     def __init__(self, test):
         self._test = test
+        self._name = sanitize_html(test.shortDescription())
+        self._dir = sanitize_html(test._dirname)
 
     @abstractmethod
     def generate_html(self) -> str:
         """Generates the HTML result of a test."""
-        return (
-            "<tr>"
-            f"<td><b>{sanitize_html(self._test.shortDescription())}</b></td>"
-            f"<td><b>{sanitize_html(self._test._dirname)}</b></td>"
-        )
+        pass
 
 class HTMLSuccessResult(HTMLResult):
     """A class for the HTML result of a successful test."""
+    __slots__ = ()
 
     def __init__(self, test):
         super().__init__(test)
 
     def generate_html(self) -> str:
         """Generates the HTML result of a successful test."""
-        return (
-            super().generate_html() +
-            "<td class=\"pass\"><b>PASS</b></td>"
-            "<td></td>"
-            "</tr>"
-        )
+        return f'<tr><td><b>{self._name}</b></td><td><b>{self._dir}</b></td><td class="pass"><b>PASS</b></td><td></td></tr>'
 
 
 class HTMLFailureResult(HTMLResult):
     """A class for the HTML result of a failed test."""
+    __slots__ = ('_stack_trace',)
 
     def __init__(self, test, stack_trace: str):
         super().__init__(test)
-        self._stack_trace = stack_trace
+        self._stack_trace = sanitize_html(stack_trace)
 
     def generate_html(self) -> str:
         """Generates the HTML result of a failed test."""
-        return (
-            super().generate_html() +
-            "<td class=\"fail\"><b>FAIL</b></td>"
-            f"<td><pre>{sanitize_html(self._stack_trace)}</pre></td>"
-            "</tr>"
-        )
+        return f'<tr><td><b>{self._name}</b></td><td><b>{self._dir}</b></td><td class="fail"><b>FAIL</b></td><td><pre>{self._stack_trace}</pre></td></tr>'
 
 
 class HTMLErrorResult(HTMLResult):
     """A class for the HTML result of a failed test."""
+    __slots__ = ('_stack_trace',)
 
     def __init__(self, test, stack_trace: str):
         super().__init__(test)
-        self._stack_trace = stack_trace
+        self._stack_trace = sanitize_html(stack_trace)
 
     def generate_html(self) -> str:
         """Generates the HTML result of a failed test."""
-        return f"""
-        {super().generate_html()}
-            <td class="error"><b>ERROR</b></td>
-            <td><pre>{sanitize_html(self._stack_trace)}</pre></td>
-        </tr>
-        """
+        return f'<tr><td><b>{self._name}</b></td><td><b>{self._dir}</b></td><td class="error"><b>ERROR</b></td><td><pre>{self._stack_trace}</pre></td></tr>'
 
 
 class HTMLTestResult(unittest.TextTestResult):
@@ -178,10 +166,8 @@ class HTMLTestResult(unittest.TextTestResult):
 
     def generate(self):
         """Generates the HTML result of a test."""
-        html_content = HTML_BEGIN
-        for result in self._test_result:
-            html_content += result.generate_html()
-        html_content += HTML_END
-        with open("results.html", "w") as f:
-            f.write(html_content)
+        with open("results.html", "w", buffering=1 << 16) as f:
+            f.write(HTML_BEGIN)
+            f.writelines(result.generate_html() for result in self._test_result)
+            f.write(HTML_END)
         webbrowser.open("results.html", new=2)
\ No newline at end of file
@@ -1,6 +1,7 @@
 __author__ = "Marc-Olivier Derouin"
 __email__ = "marcolivier.derouin@poulet-frit.com"
 
+import sys
 import unittest
 import json
 from dataclasses import dataclass
@@ -35,5 +36,7 @@ class JSONTestResult(unittest.TextTestResult):
 
     def print_report(self):
         """Prints the JSON result of a test."""
-        print(json.dumps(self._test_result))
+        json.dump(self._test_result, sys.stdout, separators=(',', ':'))
+        sys.stdout.write('\n')
+        sys.stdout.flush()
         
@@ -6,19 +6,48 @@ import _thread
 import unittest
 from unittest.mock import patch
 from abc import ABC, abstractmethod
-from typing import List, Callable, Optional, Union
+from typing import Dict, List, Callable, Optional, Tuple, Union
 from io import StringIO
-from collections import deque
 import sys
-import importlib.util
+import types
 import os
-import inspect
+import signal
 import argparse
 from school_grader.html_test_result import HTMLTestResult
 from school_grader.json_test_result import JSONTestResult
 from school_grader.equality import Equality
 
 
+# Compiled student files, keyed by path, along with their modification time when compiled
+_CODE_CACHE: Dict[str, Tuple[int, types.CodeType]] = {}
+
+
+def _compile_file(path: str) -> types.CodeType:
+    """
+    Compile a Python file, reusing the code object of a previous call if the file has not been modified since.
+
+    Args:
+        path (str): Path of the Python file to compile.
+
+    Returns:
+        The compiled code object of the file.
+    """
+    modification_time = os.stat(path).st_mtime_ns
+    cached = _CODE_CACHE.get(path)
+    if cached is not None and cached[0] == modification_time:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    _CODE_CACHE[path] = (modification_time, code)
+    return code
+
+
+def _interrupt(signum, frame) -> None:
+    """SIGALRM handler interrupting the main thread the same way `_thread.interrupt_main` does."""
+    raise KeyboardInterrupt
+
+
 def timeout(timeout_time: Optional[int]):
     """
     Decorator that sets a timer for a function execution.
@@ -52,14 +81,32 @@ def timeout(timeout_time: Optional[int]):
                 **kwargs: The keyword arguments passed to the decorated function.
             """
             timer = None
+            use_alarm = False
+            previous_handler = None
             try:
                 if timeout_time is not None:
-                    timer = threading.Timer(timeout_time, lambda: _thread.interrupt_main())
-                    timer.start()
+                    # Signal handlers only run in the main thread, elsewhere (and on Windows) fall back to a timer thread.
+                    # So does a nested timeout, which must not disarm the enclosing one, and a non-positive
+                    # time, which setitimer would take as a request to disarm instead of expiring immediately.
+                    use_alarm = (
+                        timeout_time > 0
+                        and hasattr(signal, 'setitimer')
+                        and threading.current_thread() is threading.main_thread()
+                        and signal.getitimer(signal.ITIMER_REAL)[0] == 0
+                    )
+                    if use_alarm:
+                        previous_handler = signal.signal(signal.SIGALRM, _interrupt)
+                        signal.setitimer(signal.ITIMER_REAL, timeout_time)
+                    else:
+                        timer = threading.Timer(timeout_time, lambda: _thread.interrupt_main())
+                        timer.start()
                 function(*args, **kwargs)
             except KeyboardInterrupt:
                 raise TimeoutError(f'Program execution did not finish within the allotted time of {timeout_time} seconds. You may be in an infinite loop.')
             finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+                    signal.signal(signal.SIGALRM, previous_handler if previous_handler is not None else signal.SIG_DFL)
                 if timer is not None:
                     timer.cancel()
         return inner
@@ -73,11 +120,15 @@ class TestCase(unittest.TestCase, ABC):
     def __init__(self, test_name: str, timeout_time: float, fail_message: str):
         super().__init__()
         self.tests_case.append(self)
-        self.shortDescription = lambda: test_name
+        self._short_description = test_name
         self._timeout_time = timeout_time
         self._fail_message = fail_message
         self._dirname = os.getcwd()
-        self.line_number = inspect.currentframe().f_back.f_back.f_lineno
+        self.line_number = sys._getframe(2).f_lineno
+
+    def shortDescription(self) -> str:
+        """Return the name of the test case."""
+        return self._short_description
 
     @abstractmethod
     def runTest(self) -> None:
@@ -115,10 +166,11 @@ class FileTestCase(TestCase):
         Returns:
             None
         """
+        path = os.path.join(self._dirname, f'{self._file_name}.py')
         try:
-            spec = importlib.util.spec_from_file_location(self._file_name, os.path.join(self._dirname, f'{self._file_name}.py'))
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            module = types.ModuleType(self._file_name)
+            module.__file__ = path
+            exec(_compile_file(path), module.__dict__)
         except FileNotFoundError as e:
             raise FileNotFoundError(f'File {self._file_name}.py not found. Your current working directory is {self._dirname}.') from e
 
@@ -129,11 +181,14 @@ class FileTestCase(TestCase):
         Returns:
             A function that returns the next mock input.
         """
-        queue = deque(self._mock_input)
+        inputs = self._mock_input
+        index = 0
         def fake_input(*_, **__) -> str:
-            if not queue:
+            nonlocal index
+            if index >= len(inputs):
                 raise AssertionError("Too many input calls. Check your code")
-            return queue.popleft()
+            index += 1
+            return inputs[index - 1]
         return fake_input
 
     def runTest(self):
@@ -154,7 +209,14 @@ class FileTestCase(TestCase):
             with patch('builtins.input', self.override_input()), patch('sys.stdout', new=StringIO()) as fake_out:
                 try:
                     self.run_whole_file()
-                    output = fake_out.getvalue().strip().splitlines()
+                    output = fake_out.getvalue().splitlines()
+                    # Ignore the blank lines surrounding the output
+                    start, end = 0, len(output)
+                    while start < end and not output[start].strip():
+                        start += 1
+                    while end > start and not output[end - 1].strip():
+                        end -= 1
+                    output = output[start:end]
 
                     if (len(output) != len(self._expected_output)):
                         raise AssertionError(f'The output of your program contains {len(output)} lines. You should have {len(self._expected_output)} lines')